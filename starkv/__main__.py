@@ -1,11 +1,69 @@
+import sys
+from argparse import ArgumentParser, ArgumentTypeError
+from math import ceil, sqrt
+
+from . import startup
+
+def at_least(minimum):
+    """Argument type for integers no smaller than `minimum`.
+    """
+    def parse(value):
+        value = int(value)
+        if value < minimum:
+            raise ArgumentTypeError(f"must be at least {minimum}")
+        return value
+
+    parse.__name__ = "int"  # argparse names the type in "invalid int value" errors.
+    return parse
+
+
+# Parse our own flags before kivy is imported, otherwise kivy's argument parser will reject them.
+parser = ArgumentParser(prog="starkv", add_help=False)
+parser.add_argument("--startup-times", action="store_true", help="print a breakdown of startup times")
+parser.add_argument("--graph", metavar="PATH", help="start from a directed graph in an edge-list (or .bin int32) file")
+parser.add_argument("--boards", type=at_least(1), default=1, metavar="N", help="show N independent boards in a grid")
+parser.add_argument("--nodes", type=at_least(3), default=5, metavar="N", help="number of nodes on each board when --boards > 1")
+args, sys.argv[1:] = parser.parse_known_args()
+startup.enabled = args.startup_times
+
+# Read the graph before the window is created, so a bad file is reported without one flashing up.
+graph = edges = None
+if args.graph is not None:
+    from .loader import graph_from_edges, read_edges
+
+    try:
+        edges = read_edges(args.graph)
+    except (OSError, ValueError) as e:
+        parser.error(f"--graph: {e}")
+    graph = graph_from_edges(edges)
+    startup.mark("read graph")
+
 from kivy.app import App
+startup.mark("import kivy.app")
 
 from .canvas import GraphCanvas
+startup.mark("import starkv.canvas (window created)")
 
 
 class Starkvy(App):
     def build(self):
-        return GraphCanvas()
+        if args.boards == 1:
+            root = GraphCanvas(graph=graph, edges=edges)
+        else:
+            from kivy.uix.gridlayout import GridLayout
+
+            # Boards share the default frame scheduler and mouse dispatcher.
+            root = GridLayout(cols=ceil(sqrt(args.boards)), spacing=2)
+            for _ in range(args.boards):
+                root.add_widget(GraphCanvas(graph=graph, edges=edges, nnodes=args.nodes))
+
+        startup.mark("build GraphCanvas")
+        return root
+
+    def on_stop(self):
+        layout_search = sys.modules.get("starkv.layout_search")  # Only imported if a custom graph was loaded.
+        if layout_search is not None:
+            layout_search.shutdown()
 
 
-Starkvy().run()
\ No newline at end of file
+Starkvy().run()
@@ -0,0 +1,285 @@
+"""Batched drawing of a canvas's edges and nodes.
+
+Edges and nodes are drawn as a few `Mesh`es rebuilt with numpy whenever the layout changes. `Edge` and `Node`
+instructions are only created for the few edges and nodes being interacted with (hovered, highlighted, targeted or
+moving); they're drawn above the batch, which hides those edges, and are handed back once they're idle.
+"""
+from array import array
+from math import tau
+
+import numpy as np
+from kivy.graphics import Color, Mesh
+
+from .constants import EDGE_BOUNDS, EDGE_COLOR, EDGE_WIDTH, HEAD_COLOR, NODE_COLOR, NODE_RADIUS, NODE_WIDTH
+from .edge import Edge
+from .node import Node
+from .render import arrow_heads
+
+MAX_MESH_VERTICES = 65535  # Kivy's Mesh indices are unsigned shorts.
+NODE_SIDES = 8  # Nodes are drawn as filled polygons with this many sides.
+
+# Unit polygon for nodes; its radius is the outer edge of a `Node`'s `Line` circle.
+_NODE_POLYGON = (NODE_RADIUS + NODE_WIDTH) * np.stack(
+    (np.cos(np.arange(NODE_SIDES) * tau / NODE_SIDES), np.sin(np.arange(NODE_SIDES) * tau / NODE_SIDES)), axis=-1,
+)
+
+
+def _floats(vertices):
+    """Vertices as a flat float array for `Mesh.vertices`.
+    """
+    out = array("f")
+    out.frombytes(np.ascontiguousarray(vertices, dtype=np.float32).tobytes())
+    return out
+
+
+def _indices(pattern, vertices_per_item, count):
+    """Mesh indices repeating `pattern` for `count` items of `vertices_per_item` vertices each.
+    """
+    indices = np.asarray(pattern) + vertices_per_item * np.arange(count)[:, None]
+    out = array("H")
+    out.frombytes(indices.astype(np.uint16).tobytes())
+    return out
+
+
+def _meshes(count, vertices_per_item, pattern):
+    """Create enough meshes for `count` items, returning them with the number of items in each.
+    """
+    per_mesh = MAX_MESH_VERTICES // vertices_per_item
+    meshes = []
+    for start in range(0, count, per_mesh):
+        n = min(per_mesh, count - start)
+        vertices = array("f", bytes(4 * 4 * vertices_per_item * n))  # x, y, u, v per vertex
+        meshes.append(Mesh(vertices=vertices, indices=_indices(pattern, vertices_per_item, n), mode="triangles"))
+    return meshes, per_mesh
+
+
+def _fill(meshes, per_mesh, vertices):
+    """Copy `vertices`, an (items, vertices_per_item, 4) array, into `meshes`.
+    """
+    for i, mesh in enumerate(meshes):
+        mesh.vertices = _floats(vertices[i * per_mesh:(i + 1) * per_mesh])
+
+
+def circle_layout(n, hub=None):
+    """(n, 2) array of points evenly spaced around the unit circle. If `hub` is given, that node is put at the center
+    and the rest go around the circle, as star graphs are seeded.
+    """
+    if hub is None:
+        angles = np.arange(n) * tau / max(n, 1)
+        return np.stack((np.cos(angles), np.sin(angles)), axis=-1)
+
+    layout = np.zeros((n, 2))
+    layout[np.arange(n) != hub] = circle_layout(n - 1)
+    return layout
+
+
+def layout_array(layout):
+    """An igraph `Layout` as an (n, 2) array.
+    """
+    return np.array(layout.coords, dtype=float).reshape(-1, 2)
+
+
+def edge_array(G):
+    """(m, 2) array of `G`'s edges, indexed by edge id.
+    """
+    return np.array(G.get_edgelist(), dtype=np.int32).reshape(-1, 2)
+
+
+def transform_layout(unscaled, scale, offset_x, offset_y, x, y, width, height):
+    """`GraphCanvas._transform_coords` for a whole layout.
+    """
+    return (unscaled * scale + (offset_x, offset_y)) * (width, height) + (x, y)
+
+
+class EdgeBatch:
+    """
+    All of a canvas's edges. `ends` is an (m, 2) array of (source, target) indexed by igraph edge id (a "slot"), kept in
+    step with the graph by `move`.
+    """
+    def __init__(self, canvas, ends, group):
+        self.canvas = canvas
+        self.ends = ends
+        self._group = group
+        self._edges = {}  # slot -> Edge, for edges with their own instructions
+        self._slots = {}  # Edge -> slot
+        self._layout = None
+        self._dirty = True
+
+        with group:
+            Color(*EDGE_COLOR)
+            self._body_meshes, self._body_per_mesh = _meshes(len(ends), 4, (0, 1, 2, 2, 3, 0))
+            Color(*HEAD_COLOR)
+            self._head_meshes, self._head_per_mesh = _meshes(len(ends), 3, (0, 1, 2))
+
+    def __len__(self):
+        return len(self.ends)
+
+    def materialized(self):
+        """Edges that currently have their own instructions.
+        """
+        return self._edges.values()
+
+    def slot(self, edge):
+        return self._slots[edge]
+
+    def edge(self, slot):
+        """The `Edge` for `slot`, creating its instructions if needed.
+        """
+        edge = self._edges.get(slot)
+        if edge is None:
+            source, target = self.ends[slot]
+            with self._group:
+                edge = Edge((int(source), int(target)), self.canvas)
+            edge.update()
+
+            self._edges[slot] = edge
+            self._slots[edge] = slot
+            self._dirty = True
+        return edge
+
+    def _in_use(self, edge):
+        canvas = self.canvas
+        return (
+            edge is canvas.selected_edge
+            or edge is canvas.target_edge
+            or edge in canvas.edge_moves
+            or canvas.selected_node is not None and edge.edge[0] == canvas.selected_node.index
+        )
+
+    def _release_idle(self):
+        """Hand edges that are no longer being interacted with back to the batch.
+        """
+        for slot, edge in list(self._edges.items()):
+            if not self._in_use(edge):
+                for instruction in (edge.color, edge, edge.head_color, edge.head):
+                    self._group.remove(instruction)
+                del self._edges[slot], self._slots[edge]
+                self._dirty = True
+
+    def move(self, edge, new):
+        """Mirror igraph deleting `edge` and adding `new`: later slots shift down one and `edge` becomes the last.
+        """
+        slot = self._slots[edge]
+        self.ends = np.concatenate((np.delete(self.ends, slot, axis=0), np.array([new], dtype=self.ends.dtype)))
+
+        self._edges = {other - (other > slot): e for other, e in self._edges.items() if e is not edge}
+        self._edges[len(self.ends) - 1] = edge
+        self._slots = {e: other for other, e in self._edges.items()}
+
+        edge.edge = new
+        self._dirty = True
+
+    def hit(self, x, y, slots=None, exclude=()):
+        """
+        The first edge (of `slots`, or all edges) within `EDGE_BOUNDS` of `(x, y)`, skipping the `Edge`s in `exclude`,
+        as `(slot, is_closer_to_tail)`; or None. Same test as `Edge.collides`, for many edges at once.
+        """
+        slots = np.arange(len(self.ends)) if slots is None else np.asarray(slots, dtype=np.intp)
+        if not len(slots):
+            return None
+
+        layout = self.canvas.layout
+        ends = self.ends[slots]
+        a, b = layout[ends[:, 0]], layout[ends[:, 1]]
+        ab = b - a
+        t = ((x - a[:, 0]) * ab[:, 0] + (y - a[:, 1]) * ab[:, 1]) / np.maximum((ab ** 2).sum(axis=1), 1e-12)
+        closest = a + np.clip(t, 0, 1)[:, None] * ab
+        hits = np.hypot(x - closest[:, 0], y - closest[:, 1]) <= EDGE_BOUNDS
+
+        excluded = [self._slots[edge] for edge in exclude if edge in self._slots]
+        if excluded:
+            hits &= ~np.isin(slots, excluded)
+
+        i = np.flatnonzero(hits)
+        if not len(i):
+            return None
+        return int(slots[i[0]]), bool(t[i[0]] < .5)
+
+    def update(self):
+        """Rebuild the meshes if the layout or set of materialized edges changed, and update materialized edges.
+        """
+        self._release_idle()
+
+        layout = self.canvas.layout
+        if self._dirty or layout is not self._layout:
+            self._layout = layout
+            self._dirty = False
+            self._build(layout)
+
+        for edge in self._edges.values():
+            edge.update()
+
+    def _build(self, layout):
+        points = np.concatenate((layout[self.ends[:, 0]], layout[self.ends[:, 1]]), axis=1)
+        a, b = points[:, :2], points[:, 2:]
+
+        # Quads `EDGE_WIDTH` either side of each edge, like kivy's `Line`.
+        direction = b - a
+        length = np.hypot(direction[:, 0], direction[:, 1])[:, None]
+        normal = np.divide(direction[:, ::-1] * (-1, 1), length, out=np.zeros_like(direction), where=length > 0)
+        normal *= EDGE_WIDTH
+
+        body = np.zeros((len(points), 4, 4), dtype=np.float32)
+        body[:, 0, :2] = a + normal
+        body[:, 1, :2] = a - normal
+        body[:, 2, :2] = b - normal
+        body[:, 3, :2] = b + normal
+
+        heads = np.zeros((len(points), 3, 4), dtype=np.float32)
+        heads[..., :2] = arrow_heads(points)
+
+        # Edges with their own instructions are collapsed to nothing here.
+        hidden = list(self._edges)
+        body[hidden] = 0
+        heads[hidden] = 0
+
+        _fill(self._body_meshes, self._body_per_mesh, body)
+        _fill(self._head_meshes, self._head_per_mesh, heads)
+
+
+class NodeBatch:
+    """All of a canvas's nodes. Indexing creates a `Node` drawn above the batch, e.g. for the selected node.
+    """
+    def __init__(self, canvas, n, group):
+        self.canvas = canvas
+        self.n = n
+        self._group = group
+        self._nodes = {}  # index -> Node
+        self._layout = None
+
+        pattern = np.stack((np.zeros(NODE_SIDES), np.arange(1, NODE_SIDES + 1), np.arange(2, NODE_SIDES + 2)), axis=-1)
+        pattern[-1, 2] = 1  # Close the fan.
+
+        with group:
+            Color(*NODE_COLOR)
+            self._meshes, self._per_mesh = _meshes(n, NODE_SIDES + 1, pattern.ravel().astype(int))
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        node = self._nodes.get(index)
+        if node is None:
+            with self._group:
+                node = self._nodes[index] = Node(index, self.canvas)
+            node.update()
+        return node
+
+    def update(self):
+        for index, node in list(self._nodes.items()):
+            if node is not self.canvas.selected_node:
+                self._group.remove(node.color)
+                self._group.remove(node)
+                del self._nodes[index]
+
+        layout = self.canvas.layout
+        if layout is not self._layout:
+            self._layout = layout
+
+            vertices = np.zeros((self.n, NODE_SIDES + 1, 4), dtype=np.float32)
+            vertices[:, :, :2] = layout[:, None]
+            vertices[:, 1:, :2] += _NODE_POLYGON
+            _fill(self._meshes, self._per_mesh, vertices)
+
+        for node in self._nodes.values():
+            node.update()
@@ -1,12 +1,14 @@
-from math import cos, hypot, sin, tau
-
-from igraph import Graph, Layout
+from importlib import import_module
+from math import hypot
+from threading import Thread
 
 from kivy.animation import Animation
 from kivy.clock import Clock
 from kivy.config import Config
 from kivy.core.window import Window
-from kivy.graphics import Color, Ellipse, Line, PopMatrix, PushMatrix, Rectangle, Rotate, Scale
+from kivy.graphics import (
+    Color, Ellipse, Line, PopMatrix, PushMatrix, Rectangle, Rotate, Scale, ScissorPop, ScissorPush,
+)
 from kivy.graphics.instructions import CanvasBase
 from kivy.uix.widget import Widget
 
@@ -18,6 +20,11 @@ from .constants import (
     UPDATE_INTERVAL,
     BACKGROUND_COLOR,
     MIN_SCALE,
+    MAX_SA_MOVEMENT,
+    MAX_HIGHLIGHTED_EDGES,
+    LAYOUT_MAX_NODES,
+    LAYOUT_SEARCH_POLL,
+    NODE_CHARGE,
     EDGE_COLOR,
     HEAD_COLOR,
     NODE_COLOR,
@@ -35,32 +42,70 @@ from .constants import (
     SCALE_SPEED_OUT,
     SCALE_SPEED_IN,
     TOUCH_INTERVAL,
-    MOVE_STEPS,
+    selected_gradient,
 )
-from .edge import Edge
-from .node import Node
+from .dispatcher import mouse_dispatcher
+from .moves import EdgeMoves
 from .popup import NewGameDialogue
+from .scheduler import frame_scheduler
+from . import startup
 
 Config.set('input', 'mouse', 'mouse,multitouch_on_demand')  # This setting so we can set the color of multitouch dots manually.
 
-def circle_points(n):
-    """Yield `n` points evenly space around a circle centered at (0, 0) with radius 1.
+def _preload():
+    """Import igraph and numpy off the main thread so they're ready by the time a node count has been picked.
     """
-    for i in range(n):
-        yield cos(tau * i / n), sin(tau * i / n)
+    import_module("igraph")
+    import_module("starkv.batch")
+    startup.mark("import igraph and numpy (background)")
 
 
 class GraphCanvas(Widget):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self, *args, graph=None, edges=None, nnodes=None, scheduler=frame_scheduler, mouse=mouse_dispatcher, **kwargs,
+    ):
+        """
+        If `graph` is given each game starts from a copy of it; else if `nnodes` is given each game starts from a star
+        with that many nodes; otherwise the number of nodes is asked for. `edges` is `graph`'s (m, 2) array of edges,
+        if already known (e.g. from `loader.read_edges`). Boards shown together should share `scheduler` and `mouse`,
+        which the defaults do.
+        """
         super().__init__(*args, **kwargs)
 
+        if graph is not None:
+            from .loader import check_drawable
+
+            check_drawable(graph)
+
+        self.graph = graph
+        self.graph_edges = edges
+        self.preset_nnodes = nnodes
+        self.scheduler = scheduler
+        self.mouse = mouse
         self._touches = []
         self.delay = RESIZE_DELAY
         self._mouse_pos_disabled = True
 
+        self._init_clipping()
         self._init_animations()
         self.load_graph()
 
+    def _init_clipping(self):
+        """Clip drawing to this board, so zoomed or dragged graphs don't draw over neighbouring boards.
+        """
+        # First in `canvas.before` and last in `canvas.after`, which `setup_canvas` only ever appends to.
+        with self.canvas.before:
+            self._scissor = ScissorPush()
+        with self.canvas.after:
+            ScissorPop()
+
+        self._clip()
+        self.bind(size=self._clip, pos=self._clip)
+
+    def _clip(self, *args):
+        self._scissor.x, self._scissor.y = map(int, self.pos)
+        self._scissor.width, self._scissor.height = map(int, self.size)
+
     def _init_animations(self):
         self.scale_animation = (
               Animation(size=(ANIMATION_WIDTH_2, ANIMATION_HEIGHT_2), duration=SCALE_SPEED_OUT, step=UPDATE_INTERVAL)
@@ -69,36 +114,71 @@ class GraphCanvas(Widget):
         self.scale_animation.repeat = True
         self.scale_animation.bind(on_progress=self._reposition_animated_node)
 
-        self.rotate_animation = Clock.schedule_interval(self._rotate_node, UPDATE_INTERVAL)
-        self.rotate_animation.cancel()
+        self.rotate_animation = self.scheduler.schedule_interval(self._rotate_node)
 
         self.edge_color_animation = Animation(a=0)
         self.edge_animation = Animation(width=ANIMATED_EDGE_WIDTH)
         self.edge_animation.bind(on_start=self._edge_animation_start, on_complete=self._reschedule_edge_animation)
 
-        # Schedule events
-        self.edge_move = Clock.schedule_interval(self._move_edge, UPDATE_INTERVAL)
-        self.edge_move.cancel()
+        self.edge_moves = EdgeMoves(self)
 
+        # Schedule events
         self.resize_event = Clock.schedule_once(self.update_canvas, self.delay)
         self.resize_event.cancel()
 
-        self.layout_stepper = Clock.schedule_interval(self.step_layout, UPDATE_INTERVAL)
-        self.layout_stepper.cancel()
+        self.layout_search_event = Clock.create_trigger(self._apply_layout_search, LAYOUT_SEARCH_POLL, interval=True)
+
+        self.layout_stepper = self.scheduler.schedule_interval(self.step_layout)
 
     def load_graph(self):
-        """Set initial graph.
+        """Set initial graph. The node count dialogue is skipped if we were given a graph or a node count.
         """
+        if self.graph is not None:
+            self.setup_canvas(self.graph.copy(), self.graph_edges)
+            return
+
+        if self.preset_nnodes is not None:
+            self.nnodes = self.preset_nnodes
+            self.setup_canvas()
+            return
+
         self._selecting_nnodes = True
+        Thread(target=_preload, daemon=True).start()  # Cheap if already imported.
         NewGameDialogue(self).open()
+        Clock.schedule_once(lambda dt: startup.mark("new game dialogue drawn"))
 
-    def setup_canvas(self):
-        """Populate the canvas with the initial instructions.
+    def setup_canvas(self, G=None, ends=None):
         """
+        Populate the canvas with the initial instructions. If `G` is None, a star graph with `nnodes` nodes is used.
+        `ends` is `G`'s (m, 2) array of edges, if already known.
+        """
+        # These block only if the background import hasn't finished yet.
+        from igraph import Graph
+
+        from .batch import EdgeBatch, NodeBatch, circle_layout, edge_array
+        from .constants import LAYOUT_SEARCH_MAX_NODES
+
         self._selecting_nnodes = False
+        self._layout_search = None
+
+        if G is None:
+            self.G = Graph.Star(self.nnodes, mode="out")
+            self._unscaled_layout = circle_layout(self.nnodes, hub=0)
+        else:
+            # Start from a circle; a better layout is swapped in by `_apply_layout_search` once the search settles.
+            self.G = G
+            self.nnodes = G.vcount()
+            self._unscaled_layout = circle_layout(G.vcount())
+            if G.vcount() <= LAYOUT_SEARCH_MAX_NODES:
+                from .layout_search import search_layout
 
-        self.G = Graph.Star(self.nnodes, mode="out")
-        self._unscaled_layout = Layout([(0.0, 0.0), *circle_points(self.nnodes - 1)])
+                self._layout_search = search_layout(G)
+
+        if ends is None:
+            ends = edge_array(self.G)
+
+        self._iterate_layout = self.G.vcount() <= LAYOUT_MAX_NODES
+        self._layout_dirty = True
 
         self.scale = INIT_SCALE
         self.offset_x, self.offset_y = INIT_OFFSET
@@ -119,8 +199,7 @@ class GraphCanvas(Widget):
 
         # Edge instructions before Node instructions so they're drawn underneath nodes.
         self._edge_instructions = CanvasBase()
-        with self._edge_instructions:
-            self.edges = {edge.tuple: Edge(edge.tuple, self) for edge in self.G.es}
+        self.edges = EdgeBatch(self, ends, self._edge_instructions)
         self.canvas.add(self._edge_instructions)
 
         # Animated node drawn above edges but below other nodes.
@@ -133,25 +212,40 @@ class GraphCanvas(Widget):
             PopMatrix()
 
         self._node_instructions = CanvasBase()
-        with self._node_instructions:
-            self.nodes = [Node(vertex.index, self) for vertex in self.G.vs]
+        self.nodes = NodeBatch(self, self.G.vcount(), self._node_instructions)
         self.canvas.add(self._node_instructions)
 
         # TODO: Refactor so we only need to do this once
         self.bind(size=self._delayed_resize, pos=self._delayed_resize)
-        Window.bind(mouse_pos=self.on_mouse_pos)
+        self.mouse.register(self)
+
+        if self._layout_search is not None:
+            self._apply_layout_search()  # Swaps a finished search's layout in now, else polls for it.
 
         self.step_layout()
         self.layout_stepper()
 
         self._mouse_pos_disabled = False
 
+        startup.mark("setup canvas")
+        Clock.schedule_once(self._warm_up, UPDATE_INTERVAL)
+
+    def _warm_up(self, dt):
+        """Create resources that aren't needed for the first frame. `dt` is a dummy arg required for kivy's scheduler.
+        """
+        selected_gradient(False)  # Positional, as in `Edge.update`, so lru_cache keys match.
+        selected_gradient(True)
+        startup.mark("create edge textures (deferred)")
+        startup.report()
+
     def reset(self):
         self._mouse_pos_disabled = True
+        self.mouse.unregister(self)  # Re-registered once the new graph is set up.
 
         # Stop all animations
         self.layout_stepper.cancel()
-        self.edge_move.cancel()
+        self.layout_search_event.cancel()  # Drop whatever the search finds; it was for the graph being reset.
+        self.edge_moves.clear()
 
         self.scale_animation.stop(self.animated_node)
         self.rotate_animation.cancel()
@@ -184,15 +278,13 @@ class GraphCanvas(Widget):
     @selected_node.setter
     def selected_node(self, node):
         edges = self.edges
-        G = self.G
 
         if self._selected_node is not None:
-            # Reset node and out-edges to their default colors
+            # Reset node and out-edges to their default colors. They're handed back to the batches once idle.
             self._selected_node.color.rgba = NODE_COLOR
 
-            for edge in G.vs[self._selected_node.index].out_edges():
-                e = edges[edge.tuple]
-                if e is not self.selected_edge:
+            for e in edges.materialized():
+                if e.edge[0] == self._selected_node.index and e is not self.selected_edge:
                     e.color.rgba = EDGE_COLOR
                     e.head_color.rgba = HEAD_COLOR
 
@@ -201,8 +293,8 @@ class GraphCanvas(Widget):
             # Highlight this node and adjacent out-edges
             node.color.rgba = HIGHLIGHTED_NODE
 
-            for edge in G.vs[node.index].out_edges():
-                e = edges[edge.tuple]
+            for slot in self.G.incident(node.index, mode="out")[:MAX_HIGHLIGHTED_EDGES]:
+                e = edges.edge(slot)
                 if e is not self.selected_edge:
                     e.color.rgba = HIGHLIGHTED_EDGE
                     e.head_color.rgba = HIGHLIGHTED_HEAD
@@ -260,19 +352,22 @@ class GraphCanvas(Widget):
         """Transform vertex coordinates to canvas coordinates.
         """
         return (
-            (coord[0] * self.scale + self.offset_x) * self.width,
-            (coord[1] * self.scale + self.offset_y) * self.height,
+            (coord[0] * self.scale + self.offset_x) * self.width + self.x,
+            (coord[1] * self.scale + self.offset_y) * self.height + self.y,
         )
 
     def _invert_coords(self, x, y):
         """Transform canvas coordinates to vertex coordinates.
         """
-        return (x / self.width - self.offset_x) / self.scale, (y / self.height - self.offset_y) / self.scale
+        return (
+            ((x - self.x) / self.width - self.offset_x) / self.scale,
+            ((y - self.y) / self.height - self.offset_y) / self.scale,
+        )
 
     def _rotate_node(self, dt):
         """This rotates `animated_node` when called. `dt` does nothing, but is required for kivy's scheduler.
         """
-        self.rotation_instruction.origin = self.layout[self.selected_node.index]
+        self.rotation_instruction.origin = tuple(self.layout[self.selected_node.index])
         self.rotation_instruction.angle = (self.rotation_instruction.angle + ROTATE_INCREMENT) % 360
 
     def _reposition_animated_node(self, *args):
@@ -281,6 +376,7 @@ class GraphCanvas(Widget):
         self.animated_node.pos = x - w // 2, y - h // 2
 
     def _delayed_resize(self, *args):
+        self._layout_dirty = True
         self.resize_event.cancel()
         self.resize_event()
 
@@ -302,63 +398,43 @@ class GraphCanvas(Widget):
             # Just calling edge_animation.start won't work as we're still animating, we must schedule the restart.
             Clock.schedule_once(lambda dt: self.edge_animation.start(self.animated_edge))
 
-    def _lerp_edge(self):
-        """Generator that updates the selected edge position.
+    def animate_move(self, edge, is_tail_selected, new_end):
+        """Animate moving the tail (if `is_tail_selected`) or head of `edge` to the node `new_end`. The graph is updated
+        when the animation finishes. Any number of moves can be animated at once.
         """
-        # Before we reset the edge colors grab the information we need to lerp:
+        self.edge_moves.add(edge, is_tail_selected, new_end)
+
+    def finish_move(self, move):
+        """Update the underlying graph once `move` has finished animating.
+        """
+        edge = move.edge
+        source, target = edge.edge
+        new = (move.new_end, target) if move.is_tail_selected else (source, move.new_end)
+
+        self.G.delete_edges([self.edges.slot(edge)])
+        self.G.add_edge(*new)
+        self.edges.move(edge, new)
+
+        # The edge may have been highlighted as an out-edge of the selected node while it moved; color it for its new ends.
+        if self.selected_node is not None and edge.edge[0] == self.selected_node.index:
+            edge.color.rgba = HIGHLIGHTED_EDGE
+            edge.head_color.rgba = HIGHLIGHTED_HEAD
+        else:
+            edge.color.rgba = EDGE_COLOR
+            edge.head_color.rgba = HEAD_COLOR
+
+    def move_edge(self):
+        """Move the selected edge along the target edge.
+        """
+        # Before we reset the edge colors grab the information we need to move:
         selected_edge = self.selected_edge
         is_tail_selected = selected_edge.is_tail_selected
-        sx, sy, tx, ty = selected_edge.points
-
-        start_x, start_y, stop_x, stop_y = self.target_edge.points
         new_end = self.target_edge.edge[1]
 
         # Reset the colors:
         self.source_node = self.target_edge = self.selected_edge = None  # WARNING: The order of these assignments is important.
 
-        self.layout_stepper.cancel()  # Need to turn off the layout_stepper while lerping
-        self._mouse_pos_disabled = True
-
-        yield
-
-        for i in range(MOVE_STEPS):
-            k = i / MOVE_STEPS
-            x = start_x * (1 - k) + stop_x * k
-            y = start_y * (1 - k) + stop_y * k
-            selected_edge.update_points(*((x, y, tx, ty) if is_tail_selected else (sx, sy, x, y)))
-            yield
-
-        return selected_edge, is_tail_selected, new_end  # _move_edge needs this information to update the underlying graph
-
-    def _move_edge(self, dt):
-        """Lerp the selected edge to it's new position and update the underlying graph when finished.
-        """
-        try:
-            next(self._edge_lerp)
-
-        except StopIteration as e:
-            selected_edge, is_tail_selected, new_end = e.value
-
-            self.edge_move.cancel()
-            self.G.delete_edges((selected_edge.edge,))
-            del self.edges[selected_edge.edge]
-
-            source, target = selected_edge.edge
-            if is_tail_selected:
-                selected_edge.edge =self.G.add_edge(new_end, target).tuple
-                self.edges[new_end, target] = selected_edge
-            else:
-                selected_edge.edge = self.G.add_edge(source, new_end).tuple
-                self.edges[source, new_end] = selected_edge
-
-            self.layout_stepper()
-            self._mouse_pos_disabled = False
-
-    def move_edge(self):
-        self._edge_lerp = self._lerp_edge()
-        next(self._edge_lerp)  # Prime the generator -- If we don't do this immediately it's possible to lose the
-                               # selected edge information before the scheduler calls `_move_edge`
-        self.edge_move()
+        self.animate_move(selected_edge, is_tail_selected, new_end)
 
     def on_touch_move(self, touch):
         """Zoom if multitouch, else if a node is selected, drag it, else move the entire graph.
@@ -382,6 +458,7 @@ class GraphCanvas(Widget):
             self.offset_x += touch.dx / self.width
             self.offset_y += touch.dy / self.height
 
+        self._layout_dirty = True
         self.update_canvas()
         return True
 
@@ -409,6 +486,9 @@ class GraphCanvas(Widget):
         self.offset_y += (ay - y) / self.height
 
     def on_touch_down(self, touch):
+        if not self.collide_point(*touch.pos):
+            return
+
         if touch.is_mouse_scrolling:  # REMOVE THIS: For testing only
             self.reset()
             return True
@@ -416,9 +496,6 @@ class GraphCanvas(Widget):
         if self._selecting_nnodes:
             return
 
-        if not self.collide_point(*touch.pos):
-            return
-
         touch.grab(self)
         self._touches.append(touch)
         self._mouse_pos_disabled = True
@@ -469,11 +546,13 @@ class GraphCanvas(Widget):
         # If source node is set, check collision with an adjacent out-edge.
         if self.source_node is not None:
             if self.target_edge is None:
-                for edge in self.G.vs[self.source_node.index].out_edges():
-                    target = self.edges[edge.tuple]
-                    if target is not self.selected_edge and target.collides(mx, my)[0]:
-                        self.target_edge = target
-                        break
+                hit = self.edges.hit(
+                    mx, my,
+                    slots=self.G.incident(self.source_node.index, mode="out"),
+                    exclude=(self.selected_edge, *self.edge_moves),
+                )
+                if hit is not None:
+                    self.target_edge = self.edges.edge(hit[0])
             else:
                 if not self.target_edge.collides(mx, my)[0]:
                     self.target_edge = None
@@ -486,42 +565,83 @@ class GraphCanvas(Widget):
             else:
                 self.selected_edge = None
 
-        # Check collision with all edges.
+        # Check collision with all edges. Moving edges can't be selected until they've arrived.
         else:
-            for edge in self.edges.values():
-                collides, is_tail_selected = edge.collides(mx, my)
-                if collides:
-                    self.selected_edge = edge  # This should be set before `edge.is_tail_selected`
-                    edge.is_tail_selected = is_tail_selected
-                    break
+            hit = self.edges.hit(mx, my, exclude=self.edge_moves)
+            if hit is not None:
+                slot, is_tail_selected = hit
+                edge = self.edges.edge(slot)
+                self.selected_edge = edge  # This should be set before `edge.is_tail_selected`
+                edge.is_tail_selected = is_tail_selected
             else:
                 self.selected_edge = None
 
+    def on_mouse_leave(self):
+        """Clear the selection when the mouse moves off this board, unless a touch is in progress.
+        """
+        if self._mouse_pos_disabled:
+            return
+
+        self.source_node = self.target_edge = self.selected_edge = None  # WARNING: The order of these assignments is important.
+
     def update_canvas(self, dt=0):
         """Update coordinates of all elements. `dt` is a dummy arg required for kivy's scheduler.
         """
+        # Cheap next to redrawing, and hit-testing and the animated node need a layout for the current graph.
+        if self._layout_dirty:
+            from .batch import transform_layout
+
+            self.layout = transform_layout(
+                self._unscaled_layout, self.scale, self.offset_x, self.offset_y, self.x, self.y, self.width, self.height,
+            )
+            self._layout_dirty = False
+
         if self.resize_event.is_triggered:  # We use a delayed resize, this will make sure we're done resizing before we update.
             return
 
-        for edge in self.edges.values():
-            edge.update()
+        # The batches only rebuild their meshes when `self.layout` is replaced.
+        self.edges.update()
+        self.edge_moves.update()  # After the edge updates above, which would put moving edges back on their old nodes.
 
         if self.target_edge is not None:
             self.animated_edge.points = self.target_edge.points
 
-        for node in self.nodes:
-            node.update()
+        self.nodes.update()
+
+    def _apply_layout_search(self, dt=0):
+        """Swap in the layout search's result once it's settled. `dt` is a dummy arg required for kivy's scheduler.
+        """
+        search = self._layout_search
+        if not search.done:
+            self.layout_search_event()
+            return
+
+        self.layout_search_event.cancel()
+        self._layout_search = None
+
+        layout = search.result()
+        if layout is not None:
+            from .batch import layout_array
+
+            self._unscaled_layout = layout_array(layout)
+            self._layout_dirty = True
 
     def step_layout(self, dt=0):
         """Iterate the graph layout algorithm. `dt` is a dummy arg required for kivy's scheduler.
         """
-        self._unscaled_layout = self.G.layout_graphopt(niter=1, seed=self._unscaled_layout, max_sa_movement=.1, node_charge=.00001)
+        if self._iterate_layout:
+            from .batch import layout_array
+
+            self._unscaled_layout = layout_array(self.G.layout_graphopt(
+                niter=1, seed=self._unscaled_layout.tolist(), max_sa_movement=MAX_SA_MOVEMENT, node_charge=NODE_CHARGE,
+            ))
+            self._layout_dirty = True
 
         # Keep the selected node fixed:
         if self.selected_node is not None:
-            self._unscaled_layout[self.selected_node.index] = self._selected_node_x, self._selected_node_y
-
-        self.layout = self._unscaled_layout.copy()
-        self.layout.transform(self._transform_coords)
+            index = self.selected_node.index
+            if tuple(self._unscaled_layout[index]) != (self._selected_node_x, self._selected_node_y):
+                self._unscaled_layout[index] = self._selected_node_x, self._selected_node_y
+                self._layout_dirty = True
 
         self.update_canvas()
@@ -1,11 +1,26 @@
+from functools import lru_cache
 from pathlib import Path
 
-from kivy.graphics.texture import Texture
-
 def gradient(a, b):
     """Linear interpolation from color `a` to color `b`.
     """
-    return (int(x * z + y * (255 - z)) for z in range(256) for x, y in zip(a, b))
+    return bytes(int(x * z + y * (255 - z)) for z in range(256) for x, y in zip(a, b))
+
+
+@lru_cache(maxsize=None)
+def selected_gradient(reverse=False):
+    """Texture for a selected edge, fading toward the selected end. Created on first use, as textures need a GL context
+    and most sessions only need them after the first edge is hovered.
+    """
+    from kivy.graphics.texture import Texture
+
+    texture = Texture.create(size=(256, 1))
+    texture.blit_buffer(
+        gradient(HIGHLIGHTED_EDGE, EDGE_COLOR) if reverse else gradient(EDGE_COLOR, HIGHLIGHTED_EDGE),
+        colorfmt='rgba',
+        bufferfmt='ubyte'
+    )
+    return texture
 
 
 UPDATE_INTERVAL = 1 / 60
@@ -15,6 +30,25 @@ INIT_OFFSET     = .5, .5
 TOUCH_INTERVAL  = .4  # Number of seconds before a touch event is considered a touch move event
 MIN_SCALE       = .05
 
+# Layout (`Graph.layout_graphopt` parameters)
+MAX_SA_MOVEMENT = .1
+NODE_CHARGE     = .00001
+
+# Initial layout search
+LAYOUT_SEARCH_CANDIDATES = 8      # Number of seeds tried
+LAYOUT_SEARCH_NITER      = 50     # Layout iterations run on each seed
+LAYOUT_SEARCH_BUDGET     = .25    # Seconds to wait for results before using the best found so far
+LAYOUT_SEARCH_POLL       = .05    # Seconds between checks for results
+LAYOUT_SEARCH_MAX_EDGES  = 1000   # Larger graphs skip the search, as scoring crossings is quadratic in edges
+LAYOUT_SEARCH_MAX_NODES  = 300    # Likewise, as energy and layout iterations are quadratic in nodes; at these limits
+                                  # one candidate takes about 0.1s, well within the budget
+
+# Edges and nodes are drawn in batches; these bound the memory their vertices take (about 112 bytes per edge and 144 per node).
+MAX_DRAWN_NODES       = 1_000_000
+MAX_DRAWN_EDGES       = 2_000_000
+MAX_HIGHLIGHTED_EDGES = 1000   # Out-edges of a selected node that are highlighted
+LAYOUT_MAX_NODES      = 1000   # Larger graphs keep their initial layout, as each layout step is quadratic in nodes
+
 HEAD_BASE         =  -0.5,   0.0,  -4.0, 1.0, -4.0, -1.0  # Triangle base points for arrow-heads of edges
 
 # Colors
@@ -30,20 +64,6 @@ HIGHLIGHTED_EDGE  = 0.760, 0.235, 0.239, 1.0
 HEAD_COLOR        = 0.192, 0.211, 0.560, 0.96
 HIGHLIGHTED_HEAD  = 0.912, 0.282, 0.287, 1.0
 
-SELECTED_GRADIENT = Texture.create(size=(256, 1))
-SELECTED_GRADIENT.blit_buffer(
-    bytes(gradient(EDGE_COLOR, HIGHLIGHTED_EDGE)),
-    colorfmt='rgba',
-    bufferfmt='ubyte'
-)
-
-SELECTED_GRADIENT_REVERSED = Texture.create(size=(256, 1))
-SELECTED_GRADIENT_REVERSED.blit_buffer(
-    bytes(gradient(HIGHLIGHTED_EDGE, EDGE_COLOR)),
-    colorfmt='rgba',
-    bufferfmt='ubyte'
-)
-
 # Sizes
 NODE_RADIUS   = 3
 NODE_WIDTH    = 3
@@ -65,4 +85,10 @@ SCALE_SPEED_OUT      = .75
 SCALE_SPEED_IN       = .25
 
 ANIMATED_EDGE_WIDTH  = 15
-MOVE_STEPS           = 70
+MOVE_DURATION        = 7 / 6  # Seconds
+MOVE_TRANSITION      = "in_out_quad"  # Name of a kivy AnimationTransition
+
+# Offscreen rendering
+RENDER_WIDTH         = 800
+RENDER_HEIGHT        = 600
+RENDER_CHUNKSIZE     = 16  # Frames sent to a worker process at a time
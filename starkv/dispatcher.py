@@ -0,0 +1,43 @@
+from kivy.core.window import Window
+
+
+class MouseDispatcher:
+    """
+    Routes window mouse motion to the board under the cursor, with one `Window` binding shared by all boards. A board
+    the cursor leaves is told so, so it can clear its selection.
+    """
+    def __init__(self):
+        self._boards = {}  # Used as an ordered set.
+        self._hovered = None
+        self._bound = False
+
+    def register(self, board):
+        self._boards[board] = None
+
+        if not self._bound:
+            Window.bind(mouse_pos=self.on_mouse_pos)
+            self._bound = True
+
+    def unregister(self, board):
+        self._boards.pop(board, None)
+
+        if board is self._hovered:
+            self._hovered = None
+
+    def on_mouse_pos(self, window, pos):
+        for board in self._boards:
+            if board.collide_point(*pos):
+                break
+        else:
+            board = None
+
+        if board is not self._hovered:
+            if self._hovered is not None:
+                self._hovered.on_mouse_leave()
+            self._hovered = board
+
+        if board is not None:
+            board.on_mouse_pos(window, pos)
+
+
+mouse_dispatcher = MouseDispatcher()
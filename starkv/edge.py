@@ -11,8 +11,7 @@ from .constants import (
     EDGE_COLOR,
     HEAD_COLOR,
     HIGHLIGHTED_HEAD,
-    SELECTED_GRADIENT,
-    SELECTED_GRADIENT_REVERSED,
+    selected_gradient,
 )
 
 
@@ -91,7 +90,7 @@ class Edge(Line):
 
         # Textures will be lost when points are changed, so we re-apply them.
         if self.is_tail_selected is not None:
-            self.texture = SELECTED_GRADIENT if self.is_tail_selected else SELECTED_GRADIENT_REVERSED
+            self.texture = selected_gradient(not self.is_tail_selected)
 
     def collides(self, px, py):
         """
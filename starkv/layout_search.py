@@ -0,0 +1,181 @@
+"""Multi-start search for a good initial layout.
+
+Several seed layouts are each run through a short burst of the same layout algorithm `GraphCanvas.step_layout` uses,
+in worker processes. Results are scored by edge crossings, then by energy. Nothing here blocks: `search_layout` submits
+the candidates and returns a `LayoutSearch` to poll, which settles on the best result finished within
+`LAYOUT_SEARCH_BUDGET` seconds (or the first to finish after, e.g. while the pool is still starting). Candidates still
+running are left to finish, as the limits keep each one well within the budget.
+"""
+from math import cos, sin, tau
+from multiprocessing import get_all_start_methods, get_context
+from random import Random
+from threading import Lock, Thread
+from time import monotonic
+
+import numpy as np
+from igraph import Graph, Layout
+
+from .constants import (
+    MAX_SA_MOVEMENT,
+    NODE_CHARGE,
+    LAYOUT_SEARCH_CANDIDATES,
+    LAYOUT_SEARCH_NITER,
+    LAYOUT_SEARCH_BUDGET,
+    LAYOUT_SEARCH_MAX_EDGES,
+    LAYOUT_SEARCH_MAX_NODES,
+)
+
+_pool = None  # Shared by all boards and kept until the app stops, so searches don't pay for worker startup.
+_pool_lock = Lock()
+_searches = {}  # (n, edges) -> LayoutSearch, so boards starting from the same graph share one search and its result.
+
+
+def _get_pool():
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = _new_pool()
+    return _pool
+
+
+def _new_pool():
+    # Workers aren't forked from the app's process, which has a GL context and threads running. A forkserver with
+    # this module preloaded starts them quickly; spawn is the fallback where forkserver isn't available.
+    if "forkserver" in get_all_start_methods():
+        context = get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+    else:
+        context = get_context("spawn")
+    return context.Pool()
+
+
+def shutdown():
+    """Terminate the worker processes, including any candidates still running.
+    """
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.terminate()
+        pool.join()
+
+
+def seed_layout(G, candidate):
+    """
+    Seed coordinates for `candidate`: 0 is every node on a circle, 1 is the node with the largest out-degree at the
+    center and the rest on a circle (how star graphs are seeded), and anything else is uniformly random.
+    """
+    n = G.vcount()
+
+    if candidate == 0:
+        return [(cos(tau * i / n), sin(tau * i / n)) for i in range(n)]
+
+    if candidate == 1:
+        hub = max(range(n), key=G.outdegree)
+        others = n - 1 or 1
+        coords = [(cos(tau * i / others), sin(tau * i / others)) for i in range(n - 1)]
+        coords.insert(hub, (0.0, 0.0))
+        return coords
+
+    rng = Random(candidate)
+    return [(rng.uniform(-1, 1), rng.uniform(-1, 1)) for _ in range(n)]
+
+
+def crossings(coords, edges):
+    """Number of pairs of edges that properly cross. Edges sharing an end-point don't count.
+    """
+    if len(edges) < 2:
+        return 0
+
+    points = coords[edges]  # (m, 2, 2)
+    a, b = points[:, None, 0], points[:, None, 1]
+    c, d = points[None, :, 0], points[None, :, 1]
+
+    def orientation(p, q, r):
+        return (q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1]) - (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0])
+
+    crossed = (orientation(a, b, c) * orientation(a, b, d) < 0) & (orientation(c, d, a) * orientation(c, d, b) < 0)
+    return int(crossed.sum()) // 2
+
+
+def energy(coords, edges):
+    """Spring-electrical energy: squared edge lengths plus inverse distances between all pairs of nodes.
+    """
+    springs = coords[edges[:, 0]] - coords[edges[:, 1]]
+    distances = np.hypot(*(coords[:, None] - coords[None, :]).transpose(2, 0, 1))[np.triu_indices(len(coords), 1)]
+    return float((springs ** 2).sum() + (1 / np.maximum(distances, 1e-9)).sum())
+
+
+def run_candidate(n, edgelist, candidate, niter=LAYOUT_SEARCH_NITER):
+    """Lay out the graph from seed `candidate` and score it. Returns `((crossings, energy), coords)`.
+    """
+    G = Graph(n=n, edges=edgelist, directed=True)
+    layout = G.layout_graphopt(
+        niter=niter, seed=seed_layout(G, candidate), max_sa_movement=MAX_SA_MOVEMENT, node_charge=NODE_CHARGE,
+    )
+
+    coords = np.array(layout.coords, dtype=float).reshape(-1, 2)
+    edges = np.array(edgelist, dtype=np.intp).reshape(-1, 2)
+    return (crossings(coords, edges), energy(coords, edges)), layout.coords
+
+
+class LayoutSearch:
+    """
+    Candidates submitted to the pool for one graph. They're submitted from a thread, as starting the pool takes a
+    while, and the budget starts once they are. Poll with `done` or `result`.
+    """
+    def __init__(self, n, edgelist, candidates, budget):
+        self.deadline = None
+        self._pending = None  # Set once submitted.
+        self._done = False
+        self._layout = None
+
+        Thread(target=self._submit, args=(n, edgelist, candidates, budget), daemon=True).start()
+
+    def _submit(self, n, edgelist, candidates, budget):
+        try:
+            pool = _get_pool()
+        except OSError:
+            self._pending = []  # The search fails, rather than never finishing.
+            return
+
+        self.deadline = monotonic() + budget
+        self._pending = [pool.apply_async(run_candidate, (n, edgelist, candidate)) for candidate in range(candidates)]
+
+    @property
+    def done(self):
+        """True once the search has settled on a layout, or failed.
+        """
+        if not self._done and self._pending is not None:
+            pending = self._pending
+            finished = [result for result in pending if result.ready()]
+            results = [result.get() for result in finished if result.successful()]
+
+            if len(finished) == len(pending) or results and monotonic() >= self.deadline:
+                self._done = True
+                if results:
+                    self._layout = Layout(min(results, key=lambda result: result[0])[1])
+        return self._done
+
+    def result(self):
+        """The best layout found, None if every candidate failed, or None while the search is still running.
+        """
+        return self._layout if self.done else None
+
+
+def search_layout(G, candidates=LAYOUT_SEARCH_CANDIDATES, budget=LAYOUT_SEARCH_BUDGET):
+    """
+    Start a search for a layout of `G` and return its `LayoutSearch`, or None for graphs with more than
+    `LAYOUT_SEARCH_MAX_NODES` nodes or `LAYOUT_SEARCH_MAX_EDGES` edges. Searches of the same graph, including
+    finished ones, are shared.
+    """
+    if not 2 <= G.vcount() <= LAYOUT_SEARCH_MAX_NODES or G.ecount() > LAYOUT_SEARCH_MAX_EDGES:
+        return None
+
+    n, edgelist = G.vcount(), G.get_edgelist()
+    key = n, tuple(edgelist)
+    if key not in _searches:
+        _searches[key] = LayoutSearch(n, edgelist, candidates, budget)
+    return _searches[key]
@@ -0,0 +1,94 @@
+"""Read directed graphs from edge-list files.
+
+Two formats are supported:
+    * Text edge lists: whitespace-separated `source target` pairs of 0-based vertex ids, usually one pair per line.
+    * Binary edge arrays (files ending in `.bin`): flat native-endian int32 `source, target, source, target, ...`, as
+      written by e.g. `numpy.ndarray.astype("i4").tofile`. These are memory-mapped.
+
+Edges are read into an (m, 2) int32 array, which the canvas draws from directly, and the graph is built from that
+without an intermediate list of Python tuples. Files too large to draw are rejected before the graph is built; for
+binary files, before they're read.
+"""
+import warnings
+from pathlib import Path
+
+import numpy as np
+from igraph import Graph
+
+from .constants import MAX_DRAWN_NODES, MAX_DRAWN_EDGES
+
+BINARY_SUFFIX = ".bin"
+EDGE_END_SIZE = 4  # Bytes per vertex id in binary edge arrays.
+
+
+def _check_size(path, nnodes, nedges):
+    if nnodes > MAX_DRAWN_NODES or nedges > MAX_DRAWN_EDGES:
+        raise ValueError(
+            f"{path} has {nnodes} nodes and {nedges} edges; "
+            f"at most {MAX_DRAWN_NODES} nodes and {MAX_DRAWN_EDGES} edges can be drawn"
+        )
+
+
+def _read_binary(path):
+    size = path.stat().st_size
+    if size % (2 * EDGE_END_SIZE):
+        raise ValueError(f"{path} isn't an array of int32 (source, target) pairs")
+
+    _check_size(path, 0, size // (2 * EDGE_END_SIZE))
+
+    if not size:  # Empty files can't be memory-mapped.
+        return np.empty((0, 2), dtype=np.int32)
+    return np.memmap(path, dtype=np.int32, mode="r").reshape(-1, 2)
+
+
+def _read_text(path):
+    with warnings.catch_warnings():
+        # Older numpy only warns about unparseable data, and returns what it read up to it.
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            ends = np.fromfile(path, dtype=np.int64, sep=" ")
+        except (ValueError, DeprecationWarning):
+            raise ValueError(f"{path} isn't an edge list: it contains something other than integers") from None
+
+    if len(ends) % 2:
+        raise ValueError(f"{path} isn't an edge list: it has an odd number of vertex ids")
+
+    if len(ends) and (ends.min() < 0 or ends.max() >= np.iinfo(np.int32).max):
+        raise ValueError(f"{path} isn't an edge list: vertex ids must be between 0 and {np.iinfo(np.int32).max - 1}")
+
+    return ends.astype(np.int32).reshape(-1, 2)
+
+
+def read_edges(path):
+    """Read the edge-list file at `path` into an (m, 2) int32 array of (source, target) pairs.
+    """
+    path = Path(path)
+    ends = _read_binary(path) if path.suffix == BINARY_SUFFIX else _read_text(path)
+
+    if len(ends) and ends.min() < 0:
+        raise ValueError(f"{path} has negative vertex ids")
+
+    _check_size(path, int(ends.max()) + 1 if len(ends) else 0, len(ends))
+    return ends
+
+
+def graph_from_edges(ends):
+    """Build a directed graph from an (m, 2) array of edges. Edge ids are the row indices of `ends`.
+    """
+    flat = np.ascontiguousarray(ends, dtype=np.int32).reshape(-1)
+
+    # zip re-uses its result tuple once igraph has consumed it, so no per-edge tuples are allocated.
+    it = iter(memoryview(flat))
+    return Graph(n=int(flat.max()) + 1 if len(flat) else 0, edges=zip(it, it), directed=True)
+
+
+def read_graph(path):
+    """Read a directed graph from the edge-list file at `path`.
+    """
+    return graph_from_edges(read_edges(path))
+
+
+def check_drawable(G):
+    """Raise a ValueError if `G` is too large to draw.
+    """
+    _check_size("graph", G.vcount(), G.ecount())
@@ -0,0 +1,83 @@
+from kivy.animation import AnimationTransition
+from kivy.clock import Clock
+
+from .constants import MOVE_DURATION, MOVE_TRANSITION
+
+
+class EdgeMove:
+    __slots__ = 'edge', 'is_tail_selected', 'new_end', 'start_time'
+
+    def __init__(self, edge, is_tail_selected, new_end, start_time):
+        self.edge = edge
+        self.is_tail_selected = is_tail_selected
+        self.new_end = new_end
+        self.start_time = start_time
+
+
+class EdgeMoves:
+    """
+    Animates any number of concurrent edge moves. A move slides one end of an edge from its current node to `new_end`.
+
+    Progress is eased on elapsed time rather than frame count, and end points are read from the canvas's current layout,
+    so moves stay attached to their nodes while the layout keeps stepping. `update` is called once per frame by the
+    canvas after the other edges have been updated.
+    """
+    def __init__(self, canvas, duration=MOVE_DURATION, transition=MOVE_TRANSITION):
+        self.canvas = canvas
+        self.duration = duration
+        self.transition = getattr(AnimationTransition, transition)
+        self._moves = {}  # Edge -> EdgeMove
+
+    def __contains__(self, edge):
+        return edge in self._moves
+
+    def __iter__(self):
+        return iter(self._moves)
+
+    def __len__(self):
+        return len(self._moves)
+
+    def add(self, edge, is_tail_selected, new_end):
+        """Start moving the tail (if `is_tail_selected`) or head of `edge` to the node `new_end`.
+        """
+        if edge in self._moves:
+            raise ValueError(f"edge {edge.edge} is already moving")
+
+        self._moves[edge] = EdgeMove(edge, is_tail_selected, new_end, Clock.get_time())
+
+    def clear(self):
+        self._moves.clear()
+
+    def update(self):
+        """Reposition all moving edges and commit finished moves to the canvas's graph.
+        """
+        if not self._moves:
+            return
+
+        now = Clock.get_time()
+        layout = self.canvas.layout
+        duration = self.duration
+        transition = self.transition
+        finished = []
+
+        for move in self._moves.values():
+            progress = (now - move.start_time) / duration
+            if progress >= 1:
+                finished.append(move)
+                progress = 1
+
+            k = transition(progress)
+            source, target = move.edge.edge
+            start_x, start_y = layout[source if move.is_tail_selected else target]
+            stop_x, stop_y = layout[move.new_end]
+            x = start_x * (1 - k) + stop_x * k
+            y = start_y * (1 - k) + stop_y * k
+
+            if move.is_tail_selected:
+                move.edge.update_points(x, y, *layout[target])
+            else:
+                move.edge.update_points(*layout[source], x, y)
+
+        for move in finished:
+            del self._moves[move.edge]
+            self.canvas.finish_move(move)
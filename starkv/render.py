@@ -0,0 +1,218 @@
+"""Offscreen rendering of positions to PNG files, without kivy or a GL context.
+
+Positions are drawn with the colors and geometry of the canvas (edges, arrow-heads, nodes and the selection gradient)
+by a small numpy rasterizer. `render_frames` spreads a sequence of frames over a process pool. The animated star isn't
+drawn.
+"""
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from struct import pack
+
+import numpy as np
+
+from .constants import (
+    HEAD_BASE,
+    HEAD_SIZE,
+    BACKGROUND_COLOR,
+    NODE_COLOR,
+    HIGHLIGHTED_NODE,
+    EDGE_COLOR,
+    HIGHLIGHTED_EDGE,
+    HEAD_COLOR,
+    HIGHLIGHTED_HEAD,
+    NODE_RADIUS,
+    NODE_WIDTH,
+    EDGE_WIDTH,
+    INIT_SCALE,
+    INIT_OFFSET,
+    RENDER_WIDTH,
+    RENDER_HEIGHT,
+    RENDER_CHUNKSIZE,
+)
+
+HEAD = np.array(HEAD_BASE).reshape(3, 2) * HEAD_SIZE  # Same as `Edge.HEAD`, as (x, y) rows.
+
+
+class Frame:
+    """
+    A position to render. `layout` is a sequence of unscaled node coordinates (as in `GraphCanvas._unscaled_layout`),
+    `edges` a sequence of (source, target) pairs. `selected_edge` is an index into `edges`; if set, `is_tail_selected`
+    picks which end of it is highlighted.
+    """
+    __slots__ = 'layout', 'edges', 'selected_edge', 'is_tail_selected', 'scale', 'offset'
+
+    def __init__(self, layout, edges, selected_edge=None, is_tail_selected=True, scale=INIT_SCALE, offset=INIT_OFFSET):
+        self.layout = layout
+        self.edges = edges
+        self.selected_edge = selected_edge
+        self.is_tail_selected = is_tail_selected
+        self.scale = scale
+        self.offset = offset
+
+
+class Raster:
+    """RGB float image in canvas coordinates (origin bottom-left). Shapes are alpha-blended with anti-aliased edges.
+    """
+    def __init__(self, width, height, background=BACKGROUND_COLOR):
+        self.width = width
+        self.height = height
+        self.pixels = np.empty((height, width, 3))
+        self.pixels[:] = background[:3]
+
+    def _window(self, xmin, xmax, ymin, ymax):
+        """Pixel slices and pixel-center coordinates covering a bounding box, or None if it's entirely off-image.
+        """
+        x0, x1 = max(int(xmin), 0), min(int(xmax) + 2, self.width)
+        y0, y1 = max(int(ymin), 0), min(int(ymax) + 2, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+
+        xs = np.arange(x0, x1) + .5
+        ys = np.arange(y0, y1)[:, None] + .5
+        return (slice(y0, y1), slice(x0, x1)), xs, ys
+
+    def _blend(self, window, coverage, color):
+        """Blend `color` (an rgba tuple or an array of per-pixel rgba) into `window` weighted by `coverage`.
+        """
+        color = np.asarray(color)
+        alpha = coverage * color[..., 3]
+        region = self.pixels[window]
+        region += alpha[..., None] * (color[..., :3] - region)
+
+    def segment(self, x1, y1, x2, y2, width, color, end_color=None):
+        """Draw a line `width` pixels either side of its points, like kivy's `Line`. If `end_color` is given, the
+        color is interpolated from `color` at (x1, y1) to `end_color` at (x2, y2).
+        """
+        pad = width + 1
+        window = self._window(min(x1, x2) - pad, max(x1, x2) + pad, min(y1, y2) - pad, max(y1, y2) + pad)
+        if window is None:
+            return
+        window, xs, ys = window
+
+        dx, dy = x2 - x1, y2 - y1
+        t = np.clip(((xs - x1) * dx + (ys - y1) * dy) / (dx * dx + dy * dy or 1), 0, 1)
+        distance = np.hypot(xs - x1 - t * dx, ys - y1 - t * dy)
+        coverage = np.clip(width + .5 - distance, 0, 1)
+
+        if end_color is not None:
+            color = np.asarray(color)
+            color = color + t[..., None] * (np.asarray(end_color) - color)
+
+        self._blend(window, coverage, color)
+
+    def ring(self, x, y, radius, width, color):
+        """Draw a circle outline `width` pixels either side of `radius`, like kivy's `Line(circle=...)`.
+        """
+        pad = radius + width + 1
+        window = self._window(x - pad, x + pad, y - pad, y + pad)
+        if window is None:
+            return
+        window, xs, ys = window
+
+        distance = np.abs(np.hypot(xs - x, ys - y) - radius)
+        self._blend(window, np.clip(width + .5 - distance, 0, 1), color)
+
+    def triangle(self, points, color):
+        """Fill the triangle with vertices `points`, a (3, 2) array.
+        """
+        (xmin, ymin), (xmax, ymax) = points.min(axis=0), points.max(axis=0)
+        window = self._window(xmin - 1, xmax + 1, ymin - 1, ymax + 1)
+        if window is None:
+            return
+        window, xs, ys = window
+
+        # Signed distance to each side, positive inside. Coverage is the distance to the nearest side.
+        a, b, c = points
+        orientation = np.sign((b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])) or 1
+        inside = None
+        for (px, py), (qx, qy) in ((a, b), (b, c), (c, a)):
+            dx, dy = qx - px, qy - py
+            distance = orientation * (dx * (ys - py) - dy * (xs - px)) / (np.hypot(dx, dy) or 1)
+            inside = distance if inside is None else np.minimum(inside, distance)
+
+        self._blend(window, np.clip(inside + .5, 0, 1), color)
+
+    def to_image(self):
+        """Return the image as a top-down (height, width, 3) uint8 array.
+        """
+        return (self.pixels[::-1] * 255 + .5).astype(np.uint8)
+
+
+def arrow_heads(points):
+    """Arrow-head triangles for edges with canvas coordinates `points`, an (m, 4) array of (x1, y1, x2, y2). This is
+    `Edge.update_points` applied to every edge at once; returns an (m, 3, 2) array.
+    """
+    theta = np.arctan2(points[:, 3] - points[:, 1], points[:, 2] - points[:, 0])
+    cosine, sine = np.cos(theta)[:, None], np.sin(theta)[:, None]
+    bx, by = HEAD[:, 0], HEAD[:, 1]
+    return np.stack((cosine * bx - sine * by + points[:, 2:3], sine * bx + cosine * by + points[:, 3:4]), axis=-1)
+
+
+def render_frame(frame, width=RENDER_WIDTH, height=RENDER_HEIGHT):
+    """Render `frame` to a (height, width, 3) uint8 array.
+    """
+    raster = Raster(width, height)
+
+    # Same transform as `GraphCanvas._transform_coords`:
+    layout = (np.asarray(frame.layout, dtype=float).reshape(-1, 2) * frame.scale + frame.offset) * (width, height)
+    edges = np.asarray(frame.edges, dtype=np.intp).reshape(-1, 2)
+    points = np.concatenate((layout[edges[:, 0]], layout[edges[:, 1]]), axis=1)
+    heads = arrow_heads(points)
+
+    selected_node = None
+    if frame.selected_edge is not None:
+        selected_node = edges[frame.selected_edge, 0 if frame.is_tail_selected else 1]
+
+    for i, ((source, _), (x1, y1, x2, y2), head) in enumerate(zip(edges, points, heads)):
+        if i == frame.selected_edge:
+            # Color is white and textured with the selection gradient, which fades from the selected end.
+            start_color, end_color = (HIGHLIGHTED_EDGE, EDGE_COLOR) if frame.is_tail_selected else (EDGE_COLOR, HIGHLIGHTED_EDGE)
+            raster.segment(x1, y1, x2, y2, EDGE_WIDTH, start_color, end_color)
+            raster.triangle(head, HEAD_COLOR if frame.is_tail_selected else HIGHLIGHTED_HEAD)
+        elif source == selected_node:
+            raster.segment(x1, y1, x2, y2, EDGE_WIDTH, HIGHLIGHTED_EDGE)
+            raster.triangle(head, HIGHLIGHTED_HEAD)
+        else:
+            raster.segment(x1, y1, x2, y2, EDGE_WIDTH, EDGE_COLOR)
+            raster.triangle(head, HEAD_COLOR)
+
+    for i, (x, y) in enumerate(layout):
+        raster.ring(x, y, NODE_RADIUS, NODE_WIDTH, HIGHLIGHTED_NODE if i == selected_node else NODE_COLOR)
+
+    return raster.to_image()
+
+
+def write_png(path, image, level=1):
+    """Write a (height, width, 3) uint8 array to `path` as a PNG. Low compression `level`s favor throughput.
+    """
+    height, width, _ = image.shape
+    rows = np.zeros((height, 1 + width * 3), dtype=np.uint8)  # Each row is prefixed with filter type 0.
+    rows[:, 1:] = image.reshape(height, -1)
+
+    def chunk(kind, data):
+        return pack(">I", len(data)) + kind + data + pack(">I", zlib.crc32(kind + data))
+
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(chunk(b"IHDR", pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        file.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), level)))
+        file.write(chunk(b"IEND", b""))
+
+
+def _render_to_file(job):
+    path, frame, width, height = job
+    write_png(path, render_frame(frame, width, height))
+    return path
+
+
+def render_frames(frames, directory, width=RENDER_WIDTH, height=RENDER_HEIGHT, processes=None, chunksize=RENDER_CHUNKSIZE):
+    """Render `frames` to `directory/frame_000000.png, ...` in parallel worker processes. Returns the paths written,
+    in order. `processes` defaults to the number of CPUs.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    jobs = ((directory / f"frame_{i:06d}.png", frame, width, height) for i, frame in enumerate(frames))
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(_render_to_file, jobs, chunksize=chunksize))
@@ -0,0 +1,58 @@
+from kivy.clock import Clock
+
+from .constants import UPDATE_INTERVAL
+
+
+class ScheduledCallback:
+    """Stand-in for a kivy `ClockEvent` run by a `FrameScheduler`: call it to start, `cancel` it to stop.
+    """
+    __slots__ = 'scheduler', 'callback'
+
+    def __init__(self, scheduler, callback):
+        self.scheduler = scheduler
+        self.callback = callback
+
+    def __call__(self):
+        self.scheduler._start(self)
+
+    def cancel(self):
+        self.scheduler._callbacks.pop(self, None)
+
+    @property
+    def is_triggered(self):
+        return self in self.scheduler._callbacks
+
+
+class FrameScheduler:
+    """
+    Runs every active callback from a single Clock event per frame, so many boards don't each need their own interval
+    events. The Clock event is only scheduled while there are callbacks to run.
+    """
+    def __init__(self, interval=UPDATE_INTERVAL):
+        self.interval = interval
+        self._callbacks = {}  # Used as an ordered set.
+        self._event = None
+
+    def schedule_interval(self, callback):
+        """Return a stopped `ScheduledCallback` that calls `callback(dt)` each frame once started.
+        """
+        return ScheduledCallback(self, callback)
+
+    def _start(self, scheduled):
+        self._callbacks[scheduled] = None
+
+        if self._event is None:
+            self._event = Clock.schedule_interval(self._tick, self.interval)
+        elif not self._event.is_triggered:
+            self._event()
+
+    def _tick(self, dt):
+        for scheduled in list(self._callbacks):
+            if scheduled in self._callbacks:  # Might have been cancelled by an earlier callback this frame.
+                scheduled.callback(dt)
+
+        if not self._callbacks:
+            self._event.cancel()
+
+
+frame_scheduler = FrameScheduler()
@@ -0,0 +1,32 @@
+"""Startup timing. Run `python -m starkv --startup-times` to print a breakdown once the first board is drawn.
+"""
+import sys
+from time import perf_counter
+
+_START = perf_counter()
+
+enabled = False
+_marks = []
+
+
+def mark(label):
+    """Record the time at which `label` finished, relative to when this module was imported.
+    """
+    if enabled:
+        _marks.append((label, perf_counter() - _START))
+
+
+def report():
+    """Print each recorded mark with its elapsed and incremental times. Only the first call prints anything.
+    """
+    global enabled
+
+    if not enabled:
+        return
+    enabled = False
+
+    print("Startup times (ms):", file=sys.stderr)
+    previous = 0.0
+    for label, elapsed in sorted(_marks, key=lambda mark: mark[1]):
+        print(f"  {elapsed * 1000:9.1f}  (+{(elapsed - previous) * 1000:8.1f})  {label}", file=sys.stderr)
+        previous = elapsed